@@ -1,7 +1,8 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-import joblib
+import json
+import os
+import onnxruntime as ort
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -13,135 +14,58 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Custom CSS for better styling and visibility
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.8rem;
-        color: #FF6B6B;
-        text-align: center;
-        margin-bottom: 1rem;
-        font-weight: 700;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-    }
-    .section-header {
-        font-size: 1.4rem;
-        color: #2E86AB;
-        margin-top: 1.5rem;
-        margin-bottom: 1rem;
-        border-bottom: 3px solid #2E86AB;
-        padding-bottom: 0.5rem;
-        font-weight: 600;
-    }
-    .info-box {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        padding: 1.5rem;
-        border-radius: 15px;
-        margin-bottom: 1.5rem;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-    }
-    .prediction-high {
-        background: linear-gradient(135deg, #ff6b6b 0%, #ee5a52 100%);
-        color: white;
-        padding: 2rem;
-        border-radius: 15px;
-        border: 3px solid #ff4757;
-        text-align: center;
-        font-size: 1.6rem;
-        font-weight: 700;
-        margin: 1rem 0;
-        box-shadow: 0 6px 20px rgba(255, 107, 107, 0.3);
-    }
-    .prediction-low {
-        background: linear-gradient(135deg, #1dd1a1 0%, #10ac84 100%);
-        color: white;
-        padding: 2rem;
-        border-radius: 15px;
-        border: 3px solid #00b894;
-        text-align: center;
-        font-size: 1.6rem;
-        font-weight: 700;
-        margin: 1rem 0;
-        box-shadow: 0 6px 20px rgba(29, 209, 161, 0.3);
-    }
-    .risk-factor-box {
-        background-color: #2E86AB;
-        color: white;
-        padding: 1rem;
-        border-radius: 10px;
-        border-left: 5px solid #FF6B6B;
-        margin: 0.5rem 0;
-        font-weight: 500;
-    }
-    .recommendation-box {
-        background-color: #f8f9fa;
-        padding: 1.5rem;
-        border-radius: 10px;
-        border-left: 5px solid #1dd1a1;
-        margin: 1rem 0;
-        border: 1px solid #dee2e6;
-    }
-    .stButton button {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border: none;
-        padding: 0.75rem 2rem;
-        border-radius: 25px;
-        font-size: 1.1rem;
-        font-weight: 600;
-        transition: all 0.3s ease;
-        width: 100%;
-    }
-    .stButton button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(102, 126, 234, 0.4);
-    }
-    .footer {
-        text-align: center;
-        margin-top: 3rem;
-        padding: 1rem;
-        color: #6c757d;
-        border-top: 1px solid #dee2e6;
-        font-size: 0.9rem;
-    }
-    .parameter-help {
-        color: #6c757d;
-        font-size: 0.85rem;
-        font-style: italic;
-        margin-top: 0.25rem;
-    }
-    .result-section {
-        background: white;
-        padding: 1.5rem;
-        border-radius: 10px;
-        border: 2px solid #e9ecef;
-        margin: 1rem 0;
-    }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource
+def load_css():
+    """Read the custom stylesheet once; reruns reuse the cached string"""
+    with open(os.path.join(os.path.dirname(__file__), 'style.css')) as f:
+        return f.read()
+
+# Custom CSS for better styling and visibility (must be re-emitted on every run)
+st.markdown(f"<style>{load_css()}</style>", unsafe_allow_html=True)
+
+@st.cache_resource
+def load_artifacts():
+    """Deserialize model files once per process and share them across reruns"""
+    # Forest exported as an ONNX graph; heart_model.pkl is kept for retraining
+    with open('heart.onnx', 'rb') as f:
+        session = ort.InferenceSession(f.read(), providers=['CPUExecutionProvider'])
+    input_name = session.get_inputs()[0].name
+
+    def predict_proba(x):
+        return session.run(None, {input_name: x})[1]
+
+    # StandardScaler parameters, applied in float64 exactly as during training
+    with np.load('preproc.npz') as params:
+        scaling = (params['mean'], params['scale'])
+    # Feature order and encoder classes
+    with open('preproc.json') as f:
+        preproc = json.load(f)
+    model_columns = preproc['columns']
+    # Category -> code lookups so single predictions skip label encoding
+    cat_maps = {col: {cls: i for i, cls in enumerate(classes)} for col, classes in preproc['encoders'].items()}
+    # Plain tuples of category labels for the selectboxes
+    class_lists = {col: tuple(classes) for col, classes in preproc['encoders'].items()}
+    # Warm-up run so the first real prediction does not pay the session's lazy initialization
+    predict_proba(np.zeros((1, len(model_columns)), dtype=np.float32))
+    return predict_proba, scaling, model_columns, class_lists, cat_maps
 
 def load_model_files():
     """Load model files with proper error handling"""
     try:
-        model = joblib.load('heart_model.pkl')
-        scaler = joblib.load('scaler.pkl')
-        model_columns = joblib.load('model_columns.pkl')
-        label_encoders = joblib.load('label_encoders.pkl')
-        return model, scaler, model_columns, label_encoders
+        return load_artifacts()
     except FileNotFoundError as e:
         st.error(f"❌ Model file missing: {e}")
         st.info("🔧 Please run train.py first to generate model files")
-        return None, None, None, None
+        return None, None, None, None, None
 
 def main():
     # Header section
     st.markdown('<div class="main-header">❤️ Heart Disease Predictor</div>', unsafe_allow_html=True)
     
     # Load model files
-    model, scaler, model_columns, label_encoders = load_model_files()
+    predict_proba, scaling, model_columns, class_lists, cat_maps = load_model_files()
     
-    if model is None:
+    if predict_proba is None:
         return
 
     # Introduction box
@@ -156,134 +80,142 @@ def main():
     """, unsafe_allow_html=True)
 
     # Create main interface
-    display_input_section(label_encoders)
+    submitted = display_input_section(class_lists)
     
-    # Display prediction results immediately below inputs
-    if hasattr(st.session_state, 'prediction_made') and st.session_state.prediction_made:
-        display_prediction_results(model, scaler, model_columns, label_encoders)
+    # Display prediction results immediately below inputs, in the same run as the submit
+    if submitted or st.session_state.get('prediction_made'):
+        st.session_state.prediction_made = True
+        display_prediction_results(predict_proba, scaling, model_columns, cat_maps)
     
     # Footer
     display_footer()
 
-def display_input_section(label_encoders):
+def display_input_section(class_lists):
     """Display all input parameters in an organized manner"""
     
     st.markdown('<div class="section-header">👤 Patient Health Parameters</div>', unsafe_allow_html=True)
     
-    # Demographic Information
-    st.subheader("Personal Information")
-    col1, col2 = st.columns(2)
+    # Widgets inside a form only trigger a rerun when the form is submitted
+    with st.form("patient_inputs"):
+        # Demographic Information
+        st.subheader("Personal Information")
+        col1, col2 = st.columns(2)
     
-    with col1:
-        age = st.slider("**Age**", 1, 120, 50, help="Your current age in years")
-        st.markdown('<div class="parameter-help">Risk increases with age, especially after 45 for men and 55 for women</div>', unsafe_allow_html=True)
+        with col1:
+            age = st.slider("**Age**", 1, 120, 50, help="Your current age in years")
+            st.markdown('<div class="parameter-help">Risk increases with age, especially after 45 for men and 55 for women</div>', unsafe_allow_html=True)
         
-    with col2:
-        sex = st.selectbox("**Biological Sex**", label_encoders['Sex'].classes_, help="Select your biological sex")
-        st.markdown('<div class="parameter-help">Men generally have higher heart disease risk at younger ages</div>', unsafe_allow_html=True)
+        with col2:
+            sex = st.selectbox("**Biological Sex**", class_lists['Sex'], help="Select your biological sex")
+            st.markdown('<div class="parameter-help">Men generally have higher heart disease risk at younger ages</div>', unsafe_allow_html=True)
 
-    # Heart & Blood Parameters
-    st.subheader("Cardiac Measurements")
-    col3, col4 = st.columns(2)
+        # Heart & Blood Parameters
+        st.subheader("Cardiac Measurements")
+        col3, col4 = st.columns(2)
     
-    with col3:
-        restbp = st.slider("**Resting Blood Pressure (mm Hg)**", 50, 200, 120, help="Your resting blood pressure measurement")
-        st.markdown('<div class="parameter-help">Normal: <120/80 mm Hg | Elevated: 120-129/<80 mm Hg</div>', unsafe_allow_html=True)
+        with col3:
+            restbp = st.slider("**Resting Blood Pressure (mm Hg)**", 50, 200, 120, help="Your resting blood pressure measurement")
+            st.markdown('<div class="parameter-help">Normal: <120/80 mm Hg | Elevated: 120-129/<80 mm Hg</div>', unsafe_allow_html=True)
         
-    with col4:
-        chol = st.slider("**Cholesterol Level (mg/dL)**", 100, 600, 200, help="Your serum cholesterol level")
-        st.markdown('<div class="parameter-help">Desirable: <200 mg/dL | Borderline: 200-239 mg/dL | High: ≥240 mg/dL</div>', unsafe_allow_html=True)
+        with col4:
+            chol = st.slider("**Cholesterol Level (mg/dL)**", 100, 600, 200, help="Your serum cholesterol level")
+            st.markdown('<div class="parameter-help">Desirable: <200 mg/dL | Borderline: 200-239 mg/dL | High: ≥240 mg/dL</div>', unsafe_allow_html=True)
 
-    # Symptoms and Tests
-    st.subheader("Symptoms & Test Results")
-    col5, col6 = st.columns(2)
+        # Symptoms and Tests
+        st.subheader("Symptoms & Test Results")
+        col5, col6 = st.columns(2)
     
-    with col5:
-        cp = st.selectbox("**Chest Pain Type**", label_encoders['ChestPainType'].classes_, help="Type of chest pain you experience")
-        st.markdown('<div class="parameter-help">Typical angina suggests higher coronary artery disease risk</div>', unsafe_allow_html=True)
+        with col5:
+            cp = st.selectbox("**Chest Pain Type**", class_lists['ChestPainType'], help="Type of chest pain you experience")
+            st.markdown('<div class="parameter-help">Typical angina suggests higher coronary artery disease risk</div>', unsafe_allow_html=True)
         
-        fbs = st.selectbox("**Fasting Blood Sugar**", ['0', '1'], help="Fasting blood sugar > 120 mg/dL")
-        st.markdown('<div class="parameter-help">>120 mg/dL indicates potential diabetes risk</div>', unsafe_allow_html=True)
+            fbs = st.selectbox("**Fasting Blood Sugar**", ['0', '1'], help="Fasting blood sugar > 120 mg/dL")
+            st.markdown('<div class="parameter-help">>120 mg/dL indicates potential diabetes risk</div>', unsafe_allow_html=True)
     
-    with col6:
-        restecg = st.selectbox("**Resting ECG Results**", label_encoders['RestingECG'].classes_, help="Results from your resting electrocardiogram")
-        st.markdown('<div class="parameter-help">Abnormal ECG may indicate heart muscle or rhythm issues</div>', unsafe_allow_html=True)
+        with col6:
+            restecg = st.selectbox("**Resting ECG Results**", class_lists['RestingECG'], help="Results from your resting electrocardiogram")
+            st.markdown('<div class="parameter-help">Abnormal ECG may indicate heart muscle or rhythm issues</div>', unsafe_allow_html=True)
         
-        exang = st.selectbox("**Exercise-Induced Angina**", label_encoders['ExerciseAngina'].classes_, help="Chest pain during physical activity")
-        st.markdown('<div class="parameter-help">Chest pain during exercise suggests coronary artery disease</div>', unsafe_allow_html=True)
+            exang = st.selectbox("**Exercise-Induced Angina**", class_lists['ExerciseAngina'], help="Chest pain during physical activity")
+            st.markdown('<div class="parameter-help">Chest pain during exercise suggests coronary artery disease</div>', unsafe_allow_html=True)
 
-    # Exercise Test Parameters
-    st.subheader("Exercise Stress Test Results")
-    col7, col8 = st.columns(2)
+        # Exercise Test Parameters
+        st.subheader("Exercise Stress Test Results")
+        col7, col8 = st.columns(2)
     
-    with col7:
-        maxhr = st.slider("**Maximum Heart Rate Achieved**", 60, 220, 150, help="Highest heart rate during exercise")
-        st.markdown('<div class="parameter-help">Estimated max HR = 220 - Age. Lower values may indicate fitness issues</div>', unsafe_allow_html=True)
+        with col7:
+            maxhr = st.slider("**Maximum Heart Rate Achieved**", 60, 220, 150, help="Highest heart rate during exercise")
+            st.markdown('<div class="parameter-help">Estimated max HR = 220 - Age. Lower values may indicate fitness issues</div>', unsafe_allow_html=True)
         
-    with col8:
-        oldpeak = st.slider("**ST Depression (Oldpeak)**", 0.0, 10.0, 1.0, step=0.1, help="ST segment depression during exercise")
-        st.markdown('<div class="parameter-help">Higher values indicate potential myocardial ischemia</div>', unsafe_allow_html=True)
+        with col8:
+            oldpeak = st.slider("**ST Depression (Oldpeak)**", 0.0, 10.0, 1.0, step=0.1, help="ST segment depression during exercise")
+            st.markdown('<div class="parameter-help">Higher values indicate potential myocardial ischemia</div>', unsafe_allow_html=True)
 
-    # Advanced Parameters
-    st.subheader("Advanced Medical Parameters")
-    col9, col10, col11 = st.columns(3)
+        # Advanced Parameters
+        st.subheader("Advanced Medical Parameters")
+        col9, col10, col11 = st.columns(3)
     
-    with col9:
-        slope = st.selectbox("**ST Slope during Exercise**", label_encoders['ST_Slope'].classes_, help="Slope of ST segment during peak exercise")
-        st.markdown('<div class="parameter-help">Downsloping suggests coronary artery disease</div>', unsafe_allow_html=True)
+        with col9:
+            slope = st.selectbox("**ST Slope during Exercise**", class_lists['ST_Slope'], help="Slope of ST segment during peak exercise")
+            st.markdown('<div class="parameter-help">Downsloping suggests coronary artery disease</div>', unsafe_allow_html=True)
     
-    with col10:
-        ca = st.slider("**Number of Major Vessels**", 0, 3, 0, help="Number of major vessels colored by fluoroscopy")
-        st.markdown('<div class="parameter-help">More vessels colored indicates more severe disease</div>', unsafe_allow_html=True)
+        with col10:
+            ca = st.slider("**Number of Major Vessels**", 0, 3, 0, help="Number of major vessels colored by fluoroscopy")
+            st.markdown('<div class="parameter-help">More vessels colored indicates more severe disease</div>', unsafe_allow_html=True)
     
-    with col11:
-        thal = st.slider("**Thalassemia Result**", 0, 3, 1, help="Thalassemia test result")
-        st.markdown('<div class="parameter-help">Measures blood flow adequacy to heart muscle</div>', unsafe_allow_html=True)
+        with col11:
+            thal = st.slider("**Thalassemia Result**", 0, 3, 1, help="Thalassemia test result")
+            st.markdown('<div class="parameter-help">Measures blood flow adequacy to heart muscle</div>', unsafe_allow_html=True)
 
-    # Store all inputs in session state
-    st.session_state.user_inputs = {
-        'Age': age,
-        'Sex': sex,
-        'ChestPainType': cp,
-        'RestingBP': restbp,
-        'Cholesterol': chol,
-        'FastingBS': int(fbs),
-        'RestingECG': restecg,
-        'MaxHR': maxhr,
-        'ExerciseAngina': exang,
-        'Oldpeak': oldpeak,
-        'ST_Slope': slope,
-        'Ca': ca,
-        'Thal': thal
-    }
+        # Store all inputs in session state
+        st.session_state.user_inputs = {
+            'Age': age,
+            'Sex': sex,
+            'ChestPainType': cp,
+            'RestingBP': restbp,
+            'Cholesterol': chol,
+            'FastingBS': int(fbs),
+            'RestingECG': restecg,
+            'MaxHR': maxhr,
+            'ExerciseAngina': exang,
+            'Oldpeak': oldpeak,
+            'ST_Slope': slope,
+            'Ca': ca,
+            'Thal': thal
+        }
 
-    # Predict button at the bottom of input section
-    if st.button("🔍 Analyze Heart Disease Risk", type="primary", use_container_width=True):
-        st.session_state.prediction_made = True
-        st.rerun()
+        # Submit button at the bottom of the form
+        return st.form_submit_button("🔍 Analyze Heart Disease Risk", type="primary", use_container_width=True)
+
+@st.cache_data(max_entries=512)
+def predict_risk(_predict_proba, _scaling, _cat_maps, model_columns, features):
+    """Encode one patient's features and predict; memoized on the feature tuple"""
+    
+    # Build the feature vector in model column order, encoding categoricals
+    x = np.empty((1, len(model_columns)), dtype=np.float64)
+    for i, (col, value) in enumerate(zip(model_columns, features)):
+        x[0, i] = _cat_maps[col][value] if col in _cat_maps else value
+    
+    # Scale in float64 then cast, the same order train.py uses, so inputs that land
+    # exactly on a split threshold take the same branch as in the trained forest
+    mean, scale = _scaling
+    scaled_input = ((x - mean) / scale).astype(np.float32)
+    
+    # Make prediction
+    prediction_probability = _predict_proba(scaled_input)[0]
+    return int(prediction_probability.argmax()), prediction_probability
 
-def display_prediction_results(model, scaler, model_columns, label_encoders):
+def display_prediction_results(predict_proba, scaling, model_columns, cat_maps):
     """Display prediction results immediately below inputs"""
     
     st.markdown("---")
     st.markdown('<div class="section-header">📊 Prediction Result</div>', unsafe_allow_html=True)
     
     try:
-        # Prepare input data
-        input_df = pd.DataFrame([st.session_state.user_inputs])
-        
-        # Encode categorical variables
-        for col, le in label_encoders.items():
-            if col in input_df.columns:
-                input_df[col] = le.transform(input_df[col])
-        
-        # Ensure correct column order
-        input_df = input_df[model_columns]
-        
-        # Make prediction
-        scaled_input = scaler.transform(input_df)
-        prediction = model.predict(scaled_input)[0]
-        prediction_probability = model.predict_proba(scaled_input)[0]
+        # Inputs are discrete slider/select values, so repeat submits hit the cache
+        inputs = st.session_state.user_inputs
+        features = tuple(inputs[col] for col in model_columns)
+        prediction, prediction_probability = predict_risk(predict_proba, scaling, cat_maps, model_columns, features)
         
         # Display main prediction result
         display_main_prediction(prediction, prediction_probability)
@@ -334,40 +266,62 @@ def display_main_prediction(prediction, probability):
         Continue maintaining healthy lifestyle habits and regular preventive checkups.
         """)
 
-def display_risk_factors():
-    """Analyze and display identified risk factors with proper visibility"""
+# Inputs the risk rules read; only these form the compute_risk_factors cache key
+RISK_FACTOR_FIELDS = ('Age', 'Sex', 'ChestPainType', 'RestingBP', 'Cholesterol', 'FastingBS', 'ExerciseAngina', 'Oldpeak', 'Ca')
+
+# Message for each bit returned by evaluate_risk_flags, in display order
+RISK_FACTOR_MESSAGES = (
+    "Age above 45 (Male) - Current: {Age} years",
+    "Age above 55 (Female) - Current: {Age} years",
+    "Elevated blood pressure - Current: {RestingBP} mm Hg",
+    "Elevated cholesterol - Current: {Cholesterol} mg/dL",
+    "Impaired fasting glucose (>120 mg/dL)",
+    "Exercise-induced angina (chest pain)",
+    "Significant ST depression - Value: {Oldpeak}",
+    "Minor ST depression - Value: {Oldpeak}",
+    "Fluoroscopy shows {Ca} major vessel(s) affected",
+    "Symptomatic chest pain type: {ChestPainType}",
+)
+
+def evaluate_risk_flags(age, is_male, resting_bp, cholesterol, fasting_bs, exercise_angina, oldpeak, ca, symptomatic_cp):
+    """Return a bitmask of triggered risk rules; accepts scalars or NumPy arrays for batch scoring"""
+    
+    rules = (
+        np.logical_and(age > 45, is_male),
+        np.logical_and(age > 55, np.logical_not(is_male)),
+        resting_bp >= 130,
+        cholesterol >= 200,
+        fasting_bs == 1,
+        exercise_angina,
+        oldpeak >= 1.5,
+        np.logical_and(oldpeak > 0, oldpeak < 1.5),
+        ca > 0,
+        symptomatic_cp,
+    )
+    mask = 0
+    for bit, triggered in enumerate(rules):
+        mask = mask | (np.asarray(triggered, dtype=np.int64) << bit)
+    return mask
+
+@st.cache_data(max_entries=512)
+def compute_risk_factors(values):
+    """Return risk factor descriptions for a tuple of values ordered like RISK_FACTOR_FIELDS"""
     
-    inputs = st.session_state.user_inputs
-    risk_factors = []
+    inputs = dict(zip(RISK_FACTOR_FIELDS, values))
     
     # Analyze risk factors based on medical guidelines
-    if inputs['Age'] > 45 and inputs['Sex'] == 'M':
-        risk_factors.append(f"Age above 45 (Male) - Current: {inputs['Age']} years")
-    elif inputs['Age'] > 55 and inputs['Sex'] == 'F':
-        risk_factors.append(f"Age above 55 (Female) - Current: {inputs['Age']} years")
-    
-    if inputs['RestingBP'] >= 130:
-        risk_factors.append(f"Elevated blood pressure - Current: {inputs['RestingBP']} mm Hg")
-    
-    if inputs['Cholesterol'] >= 200:
-        risk_factors.append(f"Elevated cholesterol - Current: {inputs['Cholesterol']} mg/dL")
-    
-    if inputs['FastingBS'] == 1:
-        risk_factors.append("Impaired fasting glucose (>120 mg/dL)")
-    
-    if inputs['ExerciseAngina'] == 'Y':
-        risk_factors.append("Exercise-induced angina (chest pain)")
-    
-    if inputs['Oldpeak'] >= 1.5:
-        risk_factors.append(f"Significant ST depression - Value: {inputs['Oldpeak']}")
-    elif inputs['Oldpeak'] > 0:
-        risk_factors.append(f"Minor ST depression - Value: {inputs['Oldpeak']}")
-    
-    if inputs['Ca'] > 0:
-        risk_factors.append(f"Fluoroscopy shows {inputs['Ca']} major vessel(s) affected")
+    mask = int(evaluate_risk_flags(
+        inputs['Age'], inputs['Sex'] == 'M', inputs['RestingBP'], inputs['Cholesterol'],
+        inputs['FastingBS'], inputs['ExerciseAngina'] == 'Y', inputs['Oldpeak'], inputs['Ca'],
+        inputs['ChestPainType'] in ('ATA', 'TA'),  # Atypical Angina, Typical Angina
+    ))
+    return [message.format(**inputs) for bit, message in enumerate(RISK_FACTOR_MESSAGES) if mask >> bit & 1]
+
+def display_risk_factors():
+    """Analyze and display identified risk factors with proper visibility"""
     
-    if inputs['ChestPainType'] in ['ATA', 'TA']:  # Atypical Angina, Typical Angina
-        risk_factors.append(f"Symptomatic chest pain type: {inputs['ChestPainType']}")
+    inputs = st.session_state.user_inputs
+    risk_factors = compute_risk_factors(tuple(inputs[field] for field in RISK_FACTOR_FIELDS))
 
     # Display risk factors section
     st.subheader("🔍 Identified Risk Factors")
@@ -1,11 +1,23 @@
 import pandas as pd
+import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.preprocessing import StandardScaler
 import joblib
+import json
+from skl2onnx import to_onnx
 
-# 1. Load the dataset heart.csv
-df = pd.read_csv('heart.csv')
+# 1. Load the dataset heart.csv (multithreaded pyarrow parser, explicit column types)
+df = pd.read_csv(
+    'heart.csv',
+    engine='pyarrow',
+    dtype={
+        'Age': 'int16', 'Sex': 'category', 'ChestPainType': 'category',
+        'RestingBP': 'int16', 'Cholesterol': 'int16', 'FastingBS': 'int8',
+        'RestingECG': 'category', 'MaxHR': 'int16', 'ExerciseAngina': 'category',
+        'Oldpeak': 'float64', 'ST_Slope': 'category', 'HeartDisease': 'int8'
+    }
+)
 
 print("Dataset loaded successfully!")
 print(f"Dataset shape: {df.shape}")
@@ -16,10 +28,11 @@ categorical_cols = ['Sex', 'ChestPainType', 'RestingECG', 'ExerciseAngina', 'ST_
 label_encoders = {}
 
 for col in categorical_cols:
-    le = LabelEncoder()
-    df[col] = le.fit_transform(df[col])
-    label_encoders[col] = le
-    print(f"Encoded {col}: {dict(zip(le.classes_, range(len(le.classes_))))}")
+    # sort=True keeps the alphabetical codes LabelEncoder used to assign
+    codes, uniques = pd.factorize(df[col], sort=True)
+    df[col] = codes
+    label_encoders[col] = uniques.tolist()
+    print(f"Encoded {col}: {dict(zip(label_encoders[col], range(len(uniques))))}")
 
 # 3. Split into features/target
 X = df.drop('HeartDisease', axis=1)
@@ -28,40 +41,46 @@ y = df['HeartDisease']
 print(f"Features shape: {X.shape}")
 print(f"Target distribution:\n{y.value_counts()}")
 
-# 4. Save the exact feature order for later
-joblib.dump(X.columns.tolist(), 'model_columns.pkl')
-
-# 5. Train/test split
+# 4. Train/test split
 X_train, X_test, y_train, y_test = train_test_split(
     X, y, test_size=0.2, random_state=42, stratify=y
 )
 
 print(f"Training set: {X_train.shape}, Test set: {X_test.shape}")
 
-# 6. Scale features
+# 5. Scale features in float64, then cast to float32 (main.py uses the same order)
 scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
+X_train_scaled = scaler.fit_transform(X_train).astype(np.float32)
+X_test_scaled = scaler.transform(X_test).astype(np.float32)
 
-# 7. Train classifier
-model = RandomForestClassifier(n_estimators=100, random_state=42)
+# 6. Train classifier (HistGradientBoosting was tried: lower test accuracy and no working ONNX export)
+model = RandomForestClassifier(n_estimators=50, max_depth=8, n_jobs=-1, oob_score=True, random_state=42)
 model.fit(X_train_scaled, y_train)
 
-# 8. Evaluate model
-train_score = model.score(X_train_scaled, y_train)
+# 7. Evaluate model (out-of-bag score is collected during fit, no extra pass needed)
+oob_score = model.oob_score_
 test_score = model.score(X_test_scaled, y_test)
 
-print(f"Training Accuracy: {train_score:.4f}")
+print(f"Out-of-Bag Accuracy: {oob_score:.4f}")
 print(f"Test Accuracy: {test_score:.4f}")
 
-# 9. Persist model, scaler, encoders
-joblib.dump(model, 'heart_model.pkl')
-joblib.dump(scaler, 'scaler.pkl')
-joblib.dump(label_encoders, 'label_encoders.pkl')
+# 8. Persist the model (retraining only) and the preprocessing files main.py loads
+joblib.dump(model, 'heart_model.pkl', compress=3)
+np.savez('preproc.npz', mean=scaler.mean_, scale=scaler.scale_)
+with open('preproc.json', 'w') as f:
+    json.dump({
+        'columns': X.columns.tolist(),
+        'encoders': label_encoders
+    }, f, indent=2)
+
+# 9. Export the forest as an ONNX graph for inference (main.py scales with preproc.npz)
+onnx_model = to_onnx(model, X_train_scaled[:1], options={'zipmap': False})
+with open('heart.onnx', 'wb') as f:
+    f.write(onnx_model.SerializeToString())
 
 print("\n🎯 Training complete! Files saved:")
 print(" • heart_model.pkl")
-print(" • scaler.pkl") 
-print(" • model_columns.pkl")
-print(" • label_encoders.pkl")
+print(" • preproc.npz")
+print(" • preproc.json")
+print(" • heart.onnx")
 print(f"\n📊 Model Performance: {test_score:.1%} accuracy")
\ No newline at end of file